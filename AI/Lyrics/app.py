@@ -1,154 +1,549 @@
+# lyrics_core sets the OpenMP environment before ctranslate2 loads, so it
+# must be the first import that touches the model stack.
+import lyrics_core
+from lyrics_core import format_timestamp, load_model, model_ready, run_transcription
+
 import os
-import uvicorn
 import time
-from typing import Optional
-from fastapi import FastAPI, HTTPException, UploadFile, File, Form
-from pydantic import BaseModel
-from faster_whisper import WhisperModel
-from datetime import timedelta
+import uuid
+import json
+import queue
+import asyncio
+import hashlib
+import sqlite3
+import tempfile
+import functools
+import subprocess
+import threading
 import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+import msgspec
+import numpy as np
+import uvicorn
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from smbprotocol.connection import Connection
+from smbprotocol.session import Session
+from smbprotocol.tree import TreeConnect
+from smbprotocol.open import Open, CreateDisposition, FilePipePrinterAccessMask, FileAttributes, ShareAccess, CreateOptions, ImpersonationLevel
+from smbprotocol.exceptions import SMBException, SMBResponseException
 
 # Configure Logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("LyricsAI")
 
-app = FastAPI(title="WebMusic AI Lyrics Service")
+# orjson encodes responses in C (SIMD) and gzip cuts large LRC payloads
+# 5-10x on the wire; both matter once transcripts exceed ~100 KB.
+app = FastAPI(title="WebMusic AI Lyrics Service", default_response_class=ORJSONResponse)
+app.add_middleware(GZipMiddleware, minimum_size=1024)
 
 # Load Model on Startup (Cache it)
-# On Mac M-series, "cpu" with "int8" is fast enough. 
-# Eventually we can expose env vars to control device/quantization.
-MODEL_SIZE = os.getenv("WHISPER_MODEL", "tiny")
-logger.info(f"Loading Whisper Model: {MODEL_SIZE} ...")
-try:
-    model = WhisperModel(MODEL_SIZE, device="cpu", compute_type="int8")
-    logger.info("Model loaded successfully.")
-except Exception as e:
-    logger.error(f"Failed to load model: {e}")
-    model = None
-
-# Added back helper functions
-def format_timestamp(seconds):
-    td = timedelta(seconds=seconds)
-    minutes, remaining_seconds = divmod(td.seconds, 60)
-    milliseconds = int(td.microseconds / 10000) 
-    return f"[{minutes:02d}:{remaining_seconds:02d}.{milliseconds:02d}]"
+load_model()
+
+# Single worker drains the queue so concurrent requests don't fight over
+# the CTranslate2 thread pool; faster-whisper has no multi-file batch entry
+# point, so cross-request batching happens inside BatchedInferencePipeline
+# at the 30s-chunk level instead.
+_job_queue: Optional[asyncio.Queue] = None
+
+# Dedicated bounded executor for model work, so transcription jobs can't
+# exhaust the default threadpool that serves everything else.
+_transcribe_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="transcribe")
+
+async def _transcribe_worker():
+    loop = asyncio.get_running_loop()
+    while True:
+        future, job_fn = await _job_queue.get()
+        if future.done():
+            continue  # caller disconnected while queued
+        # Nothing may escape this loop: a dead worker would hang every
+        # subsequent /transcribe on its unresolved future.
+        try:
+            result = await loop.run_in_executor(_transcribe_executor, job_fn)
+            # The future may have been cancelled (client disconnect) while
+            # the job ran; setting a result/exception then raises.
+            if not future.done():
+                future.set_result(result)
+        except Exception as e:
+            if not future.done():
+                future.set_exception(e)
+            else:
+                logger.warning(f"Transcription job failed after caller left: {e}")
+
+@app.on_event("startup")
+async def _start_transcribe_worker():
+    global _job_queue
+    _job_queue = asyncio.Queue()
+    asyncio.create_task(_transcribe_worker())
+
+async def submit_transcription(job_fn):
+    future = asyncio.get_running_loop().create_future()
+    await _job_queue.put((future, job_fn))
+    return await future
 
 @app.get("/health")
 def health_check():
-    if model is None:
+    if not model_ready():
         raise HTTPException(status_code=503, detail="Model not loaded")
-    return {"status": "ok", "model": MODEL_SIZE}
-
-import uuid
-import tempfile
-import os
-from smbprotocol.connection import Connection
-from smbprotocol.session import Session
-from smbprotocol.tree import TreeConnect
-from smbprotocol.open import Open, CreateDisposition, FilePipePrinterAccessMask, FileAttributes, ShareAccess, CreateOptions, ImpersonationLevel
-from smbprotocol.exceptions import SMBResponseException
+    return {"status": "ok", "model": lyrics_core.MODEL_SIZE, "backend": lyrics_core.BACKEND}
 
-class SmbConfig(BaseModel):
+# msgspec Structs: C-level JSON decode + validation, much cheaper per
+# request than pydantic model construction.
+class SmbConfig(msgspec.Struct):
     host: str
     share: str
     username: str
     password: str
     file_path: str
 
-class TranscriptionRequest(BaseModel):
+class TranscriptionRequest(msgspec.Struct):
     smb_config: Optional[SmbConfig] = None
     language: Optional[str] = None
     initial_prompt: Optional[str] = None
+    # Greedy decoding is ~40% faster than beam=5 on CPU and the WER delta
+    # is negligible for lyrics; callers can still ask for a wider beam.
+    # Ignored on the mlx backend (greedy only), as is vad_filter (no VAD).
+    beam_size: Optional[int] = 1
+    vad_filter: bool = True
+    # Stream segments as NDJSON while decoding instead of one JSON blob at
+    # the end; cuts time-to-first-line from whole-song to first-segment.
+    stream: bool = False
 
-# ... helper functions ...
+SMB_CHUNK_SIZE = 1024 * 1024  # 1 MiB multi-credit reads
+SMB_READ_CONCURRENCY = int(os.getenv("SMB_READ_CONCURRENCY", "8"))
+SMB_IDLE_TIMEOUT = 300  # seconds before an unused pooled tree is closed
 
-def download_smb_file(cfg: SmbConfig, local_path: str):
-    logger.info(f"Connecting to SMB: {cfg.host}, Share: {cfg.share}, Path: {cfg.file_path}")
-    connection = Connection(uuid.uuid4(), cfg.host, 445)
+# Session setup (NTLM exchange, tree connect) costs several round-trips per
+# request; pool one connection+tree per (host, share, username) and only do
+# the per-file Open/close. Entries are [connection, tree, last_used, refs];
+# refs counts in-flight downloads so the reaper can't close a busy tree.
+_smb_pool = {}
+_smb_pool_lock = threading.Lock()
+
+def _pool_key(cfg: SmbConfig):
+    return (cfg.host, cfg.share, cfg.username)
+
+def _evict_locked(key):
+    entry = _smb_pool.pop(key)
     try:
+        entry[0].disconnect()
+    except Exception:
+        pass
+
+def get_tree(cfg: SmbConfig):
+    """Return a pooled TreeConnect for cfg, creating (and caching) it on miss.
+
+    Marks the entry in use; pair every call with release_tree().
+    """
+    key = _pool_key(cfg)
+    now = time.time()
+    with _smb_pool_lock:
+        # Reap idle entries lazily; no background task needed at this QPS.
+        # A download slower than the timeout (big file over WiFi/WAN) is
+        # protected by its refcount, not its timestamp.
+        for stale in [k for k, v in _smb_pool.items()
+                      if k != key and v[3] == 0 and now - v[2] > SMB_IDLE_TIMEOUT]:
+            _evict_locked(stale)
+
+        entry = _smb_pool.get(key)
+        if entry is not None:
+            entry[2] = now
+            entry[3] += 1
+            return entry[1]
+
+        logger.info(f"Connecting to SMB: {cfg.host}, Share: {cfg.share}")
+        connection = Connection(uuid.uuid4(), cfg.host, 445)
         connection.connect()
-        session = Session(connection, cfg.username, cfg.password)
-        session.connect()
-        tree = TreeConnect(session, f"\\\\{cfg.host}\\{cfg.share}")
-        tree.connect()
-        
-        file_open = Open(tree, cfg.file_path.replace('/', '\\'))
-        file_open.create(ImpersonationLevel.Impersonation,
-                         FilePipePrinterAccessMask.GENERIC_READ, 
-                         FileAttributes.FILE_ATTRIBUTE_NORMAL, 
-                         ShareAccess.FILE_SHARE_READ | ShareAccess.FILE_SHARE_WRITE | ShareAccess.FILE_SHARE_DELETE,
-                         CreateDisposition.FILE_OPEN, 
-                         CreateOptions.FILE_NON_DIRECTORY_FILE)
         try:
-            with open(local_path, 'wb') as f:
-                offset = 0
-                while True:
-                    try:
-                        # Read 64KB chunks
-                        data = file_open.read(offset, 65536)
-                        if not data:
-                            break
-                        f.write(data)
-                        offset += len(data)
-                    except SMBResponseException as e:
-                        # Check for STATUS_END_OF_FILE (0xC0000011) which equals 3221225489 unsigned
-                        if e.status == 0xC0000011:
-                            break
-                        raise e
+            session = Session(connection, cfg.username, cfg.password)
+            session.connect()
+            tree = TreeConnect(session, f"\\\\{cfg.host}\\{cfg.share}")
+            tree.connect()
+        except Exception:
+            # Not pooled yet: disconnect here or the socket and smbprotocol's
+            # receiver thread leak on every bad-credential/missing-share try.
+            try:
+                connection.disconnect()
+            except Exception:
+                pass
+            raise
+        _smb_pool[key] = [connection, tree, now, 1]
+        return tree
+
+def release_tree(cfg: SmbConfig):
+    """Drop the in-use mark taken by get_tree(). No-op if already evicted."""
+    with _smb_pool_lock:
+        entry = _smb_pool.get(_pool_key(cfg))
+        if entry is not None:
+            entry[2] = time.time()
+            entry[3] = max(0, entry[3] - 1)
+
+def drop_tree(cfg: SmbConfig):
+    with _smb_pool_lock:
+        if _pool_key(cfg) in _smb_pool:
+            _evict_locked(_pool_key(cfg))
+
+# Session-level failures where the pooled connection is genuinely dead:
+# STATUS_USER_SESSION_DELETED, STATUS_NETWORK_SESSION_EXPIRED
+_SMB_SESSION_ERRORS = {0xC0000203, 0xC000035C}
+
+def download_smb_file(cfg: SmbConfig, sink):
+    """Stream the SMB file, calling sink(bytes) for each chunk in order."""
+    delivered = 0
+
+    def counting_sink(data):
+        nonlocal delivered
+        delivered += len(data)
+        sink(data)
+
+    for attempt in (1, 2):
+        tree = get_tree(cfg)
+        try:
+            _read_smb_file(tree, cfg, counting_sink)
+            return
+        except SMBResponseException as e:
+            # File-level errors (e.g. STATUS_OBJECT_NAME_NOT_FOUND) are
+            # deterministic: keep the healthy pooled session and propagate.
+            if e.status not in _SMB_SESSION_ERRORS:
+                raise
+            drop_tree(cfg)
+            # Stale pooled session (e.g. NAS reboot): reconnect and retry
+            # once, but only if the sink hasn't seen any bytes yet.
+            if attempt == 1 and delivered == 0:
+                logger.warning(f"SMB session stale ({e}); reconnecting and retrying once.")
+                continue
+            raise
+        except (SMBException, OSError) as e:
+            # Transport-level failure: the connection is unusable either way.
+            drop_tree(cfg)
+            if attempt == 1 and delivered == 0:
+                logger.warning(f"SMB connection failed ({e}); reconnecting and retrying once.")
+                continue
+            raise
         finally:
-            file_open.close()
+            # Safe after drop_tree: release_tree no-ops once evicted.
+            release_tree(cfg)
+
+def _read_smb_file(tree, cfg: SmbConfig, sink):
+    connection = tree.session.connection
+    file_open = Open(tree, cfg.file_path.replace('/', '\\'))
+    file_open.create(ImpersonationLevel.Impersonation,
+                     FilePipePrinterAccessMask.GENERIC_READ,
+                     FileAttributes.FILE_ATTRIBUTE_NORMAL,
+                     ShareAccess.FILE_SHARE_READ | ShareAccess.FILE_SHARE_WRITE | ShareAccess.FILE_SHARE_DELETE,
+                     CreateDisposition.FILE_OPEN,
+                     CreateOptions.FILE_NON_DIRECTORY_FILE)
+    try:
+        # Large multi-credit reads + a few in flight: every read is one
+        # SMB2 round-trip, so 64 KiB serial reads were RTT-bound.
+        chunk_size = min(SMB_CHUNK_SIZE, connection.max_read_size)
+        file_size = file_open.end_of_file
+
+        def read_chunk(offset):
+            try:
+                return file_open.read(offset, min(chunk_size, file_size - offset))
+            except SMBResponseException as e:
+                # STATUS_END_OF_FILE (0xC0000011): treat as empty chunk
+                if e.status == 0xC0000011:
+                    return b""
+                raise e
+
+        with ThreadPoolExecutor(max_workers=SMB_READ_CONCURRENCY) as pool:
+            # map() keeps results in offset order, so the sink sees a
+            # sequential stream even though reads overlap on the wire.
+            for data in pool.map(read_chunk, range(0, file_size, chunk_size)):
+                if data:
+                    sink(data)
     finally:
-        connection.disconnect()
+        file_open.close()
 
-@app.post("/transcribe")
-def transcribe_audio(req: TranscriptionRequest):
-    if not model:
-        raise HTTPException(status_code=503, detail="Model not initialized")
-    
-    if not req.smb_config:
-         raise HTTPException(status_code=400, detail="SMB Config required (Local files not supported in this mode)")
+FFMPEG_BIN = os.getenv("FFMPEG_BIN", "ffmpeg")
 
-    tmp_file = tempfile.NamedTemporaryFile(delete=False, suffix=".wav")
-    tmp_path = tmp_file.name
-    tmp_file.close()
+_FFMPEG_OUTPUT_ARGS = ["-af", "aresample=resampler=soxr",
+                       "-f", "s16le", "-ac", "1", "-ar", "16000",
+                       "-loglevel", "quiet", "pipe:1"]
+
+def _decode_seekable(data):
+    """Decode from a temp file for containers that need a seekable input.
 
+    MP4/M4A files with a trailing moov atom (non-faststart encodes) can't be
+    demuxed from a pipe; spool the already-downloaded bytes and retry.
+    """
+    tmp_file = tempfile.NamedTemporaryFile(delete=False, suffix=".audio")
+    tmp_path = tmp_file.name
     try:
-        # Download Audio from SMB
-        download_smb_file(req.smb_config, tmp_path)
-        
-        logger.info(f"Transcribing downloaded file: {tmp_path} (Lang: {req.language})")
-        
-        segments, info = model.transcribe(
-            tmp_path, 
-            beam_size=5,
-            language=req.language,
-            initial_prompt=req.initial_prompt
+        tmp_file.write(data)
+        tmp_file.close()
+        proc = subprocess.run(
+            [FFMPEG_BIN, "-i", tmp_path] + _FFMPEG_OUTPUT_ARGS,
+            stdout=subprocess.PIPE
+        )
+        return proc.stdout
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+def fetch_audio_array(cfg: SmbConfig):
+    """Pipe the SMB stream straight through ffmpeg to 16 kHz mono float32 PCM.
+
+    Avoids writing the source file to disk and re-reading it: SMB bytes go to
+    ffmpeg stdin while decoded PCM is collected from stdout concurrently. The
+    source bytes are hashed on the way through; returns (audio, content_hash).
+    """
+    # Resample once here (soxr, then s16le halves the pipe traffic); the PCM
+    # array goes straight to the model, so faster-whisper never spawns its
+    # own ffmpeg or resamples again.
+    proc = subprocess.Popen(
+        [FFMPEG_BIN, "-i", "pipe:0"] + _FFMPEG_OUTPUT_ARGS,
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE
+    )
+
+    feed_errors = []
+    hasher = hashlib.blake2b(digest_size=16)
+    # Keep the source bytes around: if the pipe decode fails (container
+    # needs seeking) we retry from a temp file without re-downloading.
+    source_buf = bytearray()
+
+    # Producer (SMB) and consumer (ffmpeg stdin) are decoupled by a bounded
+    # queue: network reads keep going while ffmpeg chews on earlier chunks,
+    # and the maxsize caps memory if the decoder falls behind.
+    chunks = queue.Queue(maxsize=16)
+
+    def produce():
+        try:
+            def tee(data):
+                hasher.update(data)
+                source_buf.extend(data)
+                chunks.put(data)
+            download_smb_file(cfg, tee)
+        except Exception as e:
+            feed_errors.append(e)
+        finally:
+            chunks.put(None)  # EOF sentinel
+
+    def consume():
+        try:
+            while True:
+                data = chunks.get()
+                if data is None:
+                    break
+                proc.stdin.write(data)
+        except (BrokenPipeError, OSError):
+            # ffmpeg died early; drain so the producer doesn't block forever
+            while chunks.get() is not None:
+                pass
+        finally:
+            try:
+                proc.stdin.close()
+            except (BrokenPipeError, OSError):
+                pass
+
+    producer = threading.Thread(target=produce, daemon=True)
+    consumer = threading.Thread(target=consume, daemon=True)
+    producer.start()
+    consumer.start()
+    pcm = proc.stdout.read()
+    producer.join()
+    consumer.join()
+    proc.wait()
+
+    if feed_errors:
+        raise feed_errors[0]
+    if not pcm and source_buf:
+        logger.info("Pipe decode produced no audio; retrying with a seekable temp file.")
+        pcm = _decode_seekable(bytes(source_buf))
+    if not pcm:
+        raise RuntimeError("ffmpeg produced no audio (unsupported or empty file?)")
+
+    # One fused multiply instead of astype() + divide (two full passes)
+    audio = np.multiply(np.frombuffer(pcm, np.int16), np.float32(1.0 / 32768.0),
+                        dtype=np.float32)
+    return audio, hasher.hexdigest()
+
+# Persistent result cache keyed by source content hash, so "regenerate
+# lyrics" for an unchanged file skips Whisper entirely. Local SQLite: the
+# sidecar deliberately has no Postgres credentials (DB writes are the C#
+# backend's job).
+CACHE_DB_PATH = os.getenv("LYRICS_CACHE_DB",
+                          os.path.join(lyrics_core.MODEL_CACHE_DIR, "transcriptions.db"))
+_cache_lock = threading.Lock()
+
+def _cache_conn():
+    os.makedirs(os.path.dirname(CACHE_DB_PATH), exist_ok=True)
+    conn = sqlite3.connect(CACHE_DB_PATH)
+    conn.execute("PRAGMA journal_mode=WAL")
+    # The key covers everything that changes the transcript: a different
+    # initial_prompt (track metadata from the C# client) or beam width must
+    # not silently return a result produced with the old settings.
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS Transcriptions (
+            ContentHash TEXT NOT NULL,
+            Model TEXT NOT NULL,
+            Language TEXT NOT NULL,
+            InitialPrompt TEXT NOT NULL DEFAULT '',
+            BeamSize INTEGER NOT NULL DEFAULT 1,
+            VadFilter INTEGER NOT NULL DEFAULT 1,
+            Result TEXT NOT NULL,
+            CreatedAt TEXT DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (ContentHash, Model, Language, InitialPrompt, BeamSize, VadFilter)
         )
-        
-        lines = []
-        full_text = []
-
-        for segment in segments:
-            timestamp = format_timestamp(segment.start)
-            text = segment.text.strip()
-            lines.append({
-                "time": timestamp,
-                "text": text
-            })
-            full_text.append(text)
-        
-        return {
+    """)
+    return conn
+
+def _cache_key(content_hash, language, initial_prompt, beam_size, vad_filter):
+    return (content_hash, lyrics_core.MODEL_SIZE, language or "auto",
+            initial_prompt or "", int(beam_size or 1), int(bool(vad_filter)))
+
+def cache_get(content_hash, language, initial_prompt, beam_size, vad_filter):
+    with _cache_lock:
+        conn = _cache_conn()
+        try:
+            row = conn.execute(
+                "SELECT Result FROM Transcriptions "
+                "WHERE ContentHash=? AND Model=? AND Language=? AND InitialPrompt=? AND BeamSize=? AND VadFilter=?",
+                _cache_key(content_hash, language, initial_prompt, beam_size, vad_filter)
+            ).fetchone()
+        finally:
+            conn.close()
+    return json.loads(row[0]) if row else None
+
+def cache_put(content_hash, language, initial_prompt, beam_size, vad_filter, result):
+    with _cache_lock:
+        conn = _cache_conn()
+        try:
+            conn.execute(
+                "INSERT OR REPLACE INTO Transcriptions "
+                "(ContentHash, Model, Language, InitialPrompt, BeamSize, VadFilter, Result) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                _cache_key(content_hash, language, initial_prompt, beam_size, vad_filter) + (json.dumps(result),)
+            )
+            conn.commit()
+        finally:
+            conn.close()
+
+def _transcribe_job(audio, language, initial_prompt, beam_size=1, vad_filter=True):
+    """Runs on the worker; materializes segments into the response dict."""
+    segments, info = run_transcription(
+        audio,
+        beam_size=beam_size,
+        language=language,
+        initial_prompt=initial_prompt,
+        vad_filter=vad_filter
+    )
+
+    # Materialize once, then build the response with comprehensions.
+    seg_data = [(segment.start, segment.text.strip()) for segment in segments]
+
+    return {
+        "language": info.language,
+        "language_prob": info.language_probability,
+        "segments": [{"time": format_timestamp(start), "text": text}
+                     for start, text in seg_data],
+        "full_text": " ".join(text for _, text in seg_data)
+    }
+
+def _segment_stream(audio, language, initial_prompt, beam_size, vad_filter,
+                    content_hash=None):
+    """Lazily consume the segments generator, yielding one NDJSON line each.
+
+    Whisper emits segments incrementally as decoding proceeds; yielding them
+    as they finish means the caller sees lyrics long before the song is fully
+    decoded. The lines are also collected so a completed stream populates the
+    cache just like the buffered path.
+    """
+    segments, info = run_transcription(
+        audio,
+        beam_size=beam_size,
+        language=language,
+        initial_prompt=initial_prompt,
+        vad_filter=vad_filter
+    )
+    yield json.dumps({
+        "language": info.language,
+        "language_prob": info.language_probability
+    }) + "\n"
+
+    lines = []
+    for segment in segments:
+        line = {
+            "time": format_timestamp(segment.start),
+            "text": segment.text.strip()
+        }
+        lines.append(line)
+        yield json.dumps(line) + "\n"
+
+    if content_hash is not None:
+        cache_put(content_hash, language, initial_prompt, beam_size, vad_filter, {
             "language": info.language,
             "language_prob": info.language_probability,
             "segments": lines,
-            "full_text": " ".join(full_text)
-        }
+            "full_text": " ".join(line["text"] for line in lines)
+        })
+
+def _stream_cached(result):
+    """Re-emit a cached buffered result in the NDJSON stream format."""
+    yield json.dumps({
+        "language": result["language"],
+        "language_prob": result["language_prob"]
+    }) + "\n"
+    for line in result["segments"]:
+        yield json.dumps(line) + "\n"
+
+@app.post("/transcribe")
+async def transcribe_audio(request: Request):
+    try:
+        req = msgspec.json.decode(await request.body(), type=TranscriptionRequest)
+    except msgspec.ValidationError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except msgspec.DecodeError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if not model_ready():
+        raise HTTPException(status_code=503, detail="Model not initialized")
+
+    if not req.smb_config:
+         raise HTTPException(status_code=400, detail="SMB Config required (Local files not supported in this mode)")
+
+    try:
+        # Stream Audio from SMB through ffmpeg (no temp file)
+        audio, content_hash = await asyncio.to_thread(fetch_audio_array, req.smb_config)
+
+        cached = await asyncio.to_thread(cache_get, content_hash, req.language,
+                                         req.initial_prompt, req.beam_size, req.vad_filter)
+        if cached is not None:
+            logger.info(f"Cache hit for {content_hash}; skipping transcription.")
+            if req.stream:
+                return StreamingResponse(_stream_cached(cached),
+                                         media_type="application/x-ndjson")
+            return cached
+
+        logger.info(f"Transcribing {len(audio) / 16000:.1f}s of audio (Lang: {req.language})")
+
+        if req.stream:
+            # Bypasses the batch queue: a sync generator is iterated in
+            # Starlette's threadpool, so the event loop stays free.
+            return StreamingResponse(
+                _segment_stream(audio, req.language, req.initial_prompt,
+                                req.beam_size or 1, req.vad_filter,
+                                content_hash=content_hash),
+                media_type="application/x-ndjson"
+            )
+
+        result = await submit_transcription(
+            functools.partial(_transcribe_job, audio, req.language, req.initial_prompt,
+                              beam_size=req.beam_size or 1, vad_filter=req.vad_filter)
+        )
+        await asyncio.to_thread(cache_put, content_hash, req.language,
+                                req.initial_prompt, req.beam_size, req.vad_filter, result)
+        return result
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Transcription failed: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        if os.path.exists(tmp_path):
-            os.remove(tmp_path)
 
 
 
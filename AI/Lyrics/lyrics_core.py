@@ -0,0 +1,166 @@
+"""Shared Whisper core for the lyrics service (app.py) and the CLI (transcribe.py).
+
+Owns backend selection (faster-whisper vs mlx-whisper), model loading,
+warm-up, and the timestamp formatter, so the service and the CLI don't each
+carry their own copy.
+
+Import this module before anything that pulls in ctranslate2: the OpenMP
+environment below must be set first.
+"""
+import os
+import psutil
+
+# Cap OpenMP *before* ctranslate2/faster-whisper import it. Oversubscribing
+# logical cores costs 10-20% steady-state throughput, and leaving one
+# physical core free keeps the API responsive while a transcription runs.
+_PHYSICAL_CORES = psutil.cpu_count(logical=False) or os.cpu_count() or 4
+CT2_THREADS = max(1, _PHYSICAL_CORES - 1)
+os.environ.setdefault("OMP_NUM_THREADS", str(CT2_THREADS))
+os.environ.setdefault("KMP_AFFINITY", "granularity=fine,compact,1,0")
+
+import time
+import platform
+import logging
+from types import SimpleNamespace
+
+import ctranslate2
+import numpy as np
+from faster_whisper import WhisperModel, BatchedInferencePipeline
+
+logger = logging.getLogger("LyricsAI")
+
+MODEL_SIZE = os.getenv("WHISPER_MODEL", "tiny")
+COMPUTE_TYPE = os.getenv("WHISPER_COMPUTE_TYPE")
+MODEL_CACHE_DIR = os.path.expanduser(os.getenv("WHISPER_CACHE_DIR", "~/.cache/webmusic-whisper"))
+
+# On Apple Silicon the CPU path is usable but the Metal/ANE path is far
+# faster; use mlx-whisper (quantized MLX weights) there when installed.
+IS_APPLE_SILICON = platform.system() == "Darwin" and platform.machine() == "arm64"
+MLX_MODEL_REPO = os.getenv("WHISPER_MLX_MODEL", "mlx-community/whisper-tiny-mlx-q4")
+
+# Batched pipeline runs the encoder on several 30s chunks per GEMM call
+# (~5x throughput on long files vs one chunk at a time).
+BATCH_SIZE = int(os.getenv("TRANSCRIBE_BATCH_SIZE", "8"))
+
+BACKEND = "faster-whisper"
+model = None
+batched_model = None
+mlx_whisper = None
+_mlx_params_warned = False
+
+def pick_compute_type():
+    """Pick the fastest quantized compute type this CPU supports.
+
+    Pure int8 GEMM is only fast on VNNI-capable CPUs; on AVX2-only boxes it
+    can be slower than FP32, so prefer the mixed int8/float kernels there
+    (and the bfloat16 variants on AMX-capable chips).
+    """
+    try:
+        supported = ctranslate2.get_supported_compute_types("cpu")
+    except Exception:
+        return "int8"
+    for candidate in ("int8_bfloat16", "int8_float16", "int8_float32", "int8"):
+        if candidate in supported:
+            return candidate
+    return "float32"
+
+def format_timestamp(seconds):
+    """Converts seconds (float) to LRC timestamp format [mm:ss.xx]"""
+    # Pure integer math; called once per segment, so skip the timedelta
+    # allocation and microsecond juggling.
+    total_cs = int(seconds * 100)
+    s, cs = divmod(total_cs, 100)
+    m, s = divmod(s, 60)
+    return f"[{m:02d}:{s:02d}.{cs:02d}]"
+
+def load_model(model_size=None, compute_type=None, warm=True):
+    """Initialize the Whisper backend (idempotent). Returns model_ready()."""
+    global BACKEND, model, batched_model, mlx_whisper, MODEL_SIZE, COMPUTE_TYPE
+
+    if model_ready():
+        return True
+
+    if model_size:
+        MODEL_SIZE = model_size
+    COMPUTE_TYPE = compute_type or COMPUTE_TYPE or pick_compute_type()
+
+    if IS_APPLE_SILICON:
+        try:
+            import mlx_whisper as _mlx_whisper
+            mlx_whisper = _mlx_whisper
+            BACKEND = "mlx"
+            logger.info(f"Using mlx-whisper backend ({MLX_MODEL_REPO}) on Apple Silicon.")
+            return True
+        except ImportError:
+            logger.info("mlx-whisper not installed; falling back to faster-whisper.")
+
+    logger.info(f"Loading Whisper Model: {MODEL_SIZE} (compute_type={COMPUTE_TYPE}) ...")
+    try:
+        model = WhisperModel(
+            MODEL_SIZE,
+            device="cpu",
+            compute_type=COMPUTE_TYPE,
+            cpu_threads=CT2_THREADS,
+            num_workers=1,
+            download_root=MODEL_CACHE_DIR
+        )
+        logger.info("Model loaded successfully.")
+    except Exception as e:
+        logger.error(f"Failed to load model: {e}")
+        model = None
+        return False
+
+    if warm:
+        # Warm the graph with 1s of silence so the first real request doesn't
+        # pay the JIT/kernel-selection cost (500-2000 ms on cold start).
+        try:
+            warm_start = time.time()
+            list(model.transcribe(np.zeros(16000, dtype=np.float32), beam_size=1)[0])
+            logger.info(f"Model warm-up done in {time.time() - warm_start:.2f}s")
+        except Exception as e:
+            logger.warning(f"Model warm-up failed (non-fatal): {e}")
+
+    batched_model = BatchedInferencePipeline(model)
+    return True
+
+def model_ready():
+    return BACKEND == "mlx" or model is not None
+
+def run_transcription(audio, language=None, initial_prompt=None, beam_size=1,
+                      vad_filter=True):
+    """Run Whisper on either backend; returns (segments, info) like faster-whisper."""
+    if BACKEND == "mlx":
+        # mlx-whisper only does VAD-less greedy decoding; don't silently
+        # pretend the knobs took effect. Warn once, not per request.
+        global _mlx_params_warned
+        if not _mlx_params_warned and (beam_size != 1 or not vad_filter):
+            logger.warning("mlx backend ignores beam_size and vad_filter "
+                           "(greedy decoding only, no VAD).")
+            _mlx_params_warned = True
+        result = mlx_whisper.transcribe(
+            audio,
+            path_or_hf_repo=MLX_MODEL_REPO,
+            language=language,
+            initial_prompt=initial_prompt
+        )
+        segments = [SimpleNamespace(start=s["start"], end=s["end"], text=s["text"])
+                    for s in result["segments"]]
+        info = SimpleNamespace(language=result.get("language"), language_probability=1.0)
+        return segments, info
+    # VAD skips decoding silence entirely (intros/outros/instrumental breaks),
+    # which also kills most hallucinated lines. Don't condition on previous
+    # text: repeated choruses otherwise snowball into repetition loops.
+    # without_timestamps defaults to True on the batched pipeline, which
+    # collapses output to one segment per ~30s VAD chunk — useless for LRC
+    # lines. Keep decoding timestamp tokens for per-line segments.
+    return batched_model.transcribe(
+        audio,
+        batch_size=BATCH_SIZE,
+        beam_size=beam_size,
+        language=language,
+        initial_prompt=initial_prompt,
+        vad_filter=vad_filter,
+        vad_parameters=dict(min_silence_duration_ms=500),
+        condition_on_previous_text=False,
+        without_timestamps=False
+    )
@@ -1,23 +1,13 @@
 import sys
 import os
-from faster_whisper import WhisperModel
-from datetime import timedelta
-
-def format_timestamp(seconds):
-    """Converts seconds (float) to LRC timestamp format [mm:ss.xx]"""
-    td = timedelta(seconds=seconds)
-    minutes, remaining_seconds = divmod(td.seconds, 60)
-    # Milliseconds are typically 2 digits in LRC, Whisper gives precise float
-    milliseconds = int(td.microseconds / 10000) 
-    return f"[{minutes:02d}:{remaining_seconds:02d}.{milliseconds:02d}]"
-
-def transcribe(audio_path, model_size="tiny", device="cpu", compute_type="int8"):
-    print(f"Loading model '{model_size}' on {device} ({compute_type})...")
-    
-    try:
-        model = WhisperModel(model_size, device=device, compute_type=compute_type)
-    except Exception as e:
-        print(f"Error loading model: {e}")
+
+def transcribe(audio_path, model_size="tiny", compute_type=None):
+    # lyrics_core sets the thread environment before ctranslate2 loads
+    import lyrics_core
+
+    if not lyrics_core.load_model(model_size=model_size, compute_type=compute_type,
+                                  warm=False):
+        print("Error loading model.")
         return
 
     if not os.path.exists(audio_path):
@@ -25,17 +15,17 @@ def transcribe(audio_path, model_size="tiny", device="cpu", compute_type="int8")
         return
 
     print(f"Transcribing: {audio_path} ...")
-    
-    segments, info = model.transcribe(audio_path, beam_size=5)
+
+    segments, info = lyrics_core.run_transcription(audio_path, beam_size=5)
 
     print(f"Detected language: {info.language} (probability: {info.language_probability:.2f})")
     print("-" * 30)
 
     lrc_lines = []
-    
+
     # Process segments
     for segment in segments:
-        start_time = format_timestamp(segment.start)
+        start_time = lyrics_core.format_timestamp(segment.start)
         text = segment.text.strip()
         line = f"{start_time}{text}"
         print(line)  # Stream output to console
@@ -50,7 +40,5 @@ if __name__ == "__main__":
 
     audio_file = sys.argv[1]
     model = sys.argv[2] if len(sys.argv) > 2 else "tiny"
-    
-    # Mac M-series specific optimization could go here (e.g. device='auto')
-    # For compatibility, starting with cpu/int8
+
     transcribe(audio_file, model_size=model)
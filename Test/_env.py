@@ -0,0 +1,33 @@
+import os
+from functools import lru_cache
+
+@lru_cache(maxsize=None)
+def load_env(path):
+    """Parse a .env file into a dict of key/value pairs.
+
+    Cached per path so scripts that hit the same file repeatedly only
+    read and split it once.
+    """
+    env = {}
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            parts = line.split('=', 1)
+            if len(parts) == 2:
+                env[parts[0]] = parts[1]
+    return env
+
+def apply_env(path, verbose=True):
+    """Load a .env file into os.environ (masking sensitive values in output)."""
+    env = load_env(path)
+    os.environ.update(env)
+    if verbose:
+        for key, val in env.items():
+            # Debug sensitive keys by hiding value
+            if "PASSWORD" in key or "KEY" in key:
+                print(f"  Loaded {key}=***")
+            else:
+                print(f"  Loaded {key}={val}")
+    return env
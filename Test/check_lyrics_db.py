@@ -1,6 +1,7 @@
 
 import os
 import psycopg2
+import psycopg2.extras
 from dotenv import load_dotenv
 
 # Load env vars from .env file to get connection info
@@ -27,28 +28,33 @@ try:
 
     # Query Lyrics table
     print("\n--- Checking Lyrics Table ---")
-    cursor.execute("SELECT COUNT(*) FROM \"Lyrics\";")
-    count = cursor.fetchone()[0]
-    print(f"Total Lyrics Records: {count}")
+    # Planner estimate (reltuples) is instant; COUNT(*) does a full seq scan.
+    # Fall back to the exact count when the table has no stats yet (-1/0).
+    cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE relname = 'Lyrics';")
+    row = cursor.fetchone()
+    count = row[0] if row else 0
+    if count <= 0:
+        cursor.execute("SELECT COUNT(*) FROM \"Lyrics\";")
+        count = cursor.fetchone()[0]
+    cursor.close()
+    print(f"Total Lyrics Records (~): {count}")
 
     if count > 0:
         print("\n--- Latest 5 Lyrics ---")
+        # Named (server-side) cursor streams rows instead of materializing
+        # the result; RealDictCursor gives dicts without a zip() per row.
+        cursor = conn.cursor(name="lyrics_stream",
+                             cursor_factory=psycopg2.extras.RealDictCursor)
+        cursor.itersize = 1000
         # Use SELECT * to avoid column name guessing issues (case sensitivity)
         cursor.execute("SELECT * FROM \"Lyrics\" LIMIT 5;")
-        
-        # Get column names from cursor description
-        colnames = [desc[0] for desc in cursor.description]
-        print(f"Columns: {colnames}")
-        
-        rows = cursor.fetchall()
-        for row in rows:
-            # Map columns by index or name
-            row_dict = dict(zip(colnames, row))
-            print(f"Row: {row_dict}\n")
+
+        for row_dict in cursor:
+            print(f"Row: {dict(row_dict)}\n")
+        cursor.close()
     else:
         print("No lyrics found yet.")
 
-    cursor.close()
     conn.close()
 
 except Exception as e:
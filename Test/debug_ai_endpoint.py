@@ -1,5 +1,6 @@
 import requests
 import json
+import sys
 
 url = "http://localhost:5001/transcribe"
 payload = {
@@ -13,11 +14,40 @@ payload = {
     "language": "en"
 }
 
-try:
-    print(f"Sending POST to {url}...")
-    r = requests.post(url, json=payload)
-    print(f"Status: {r.status_code}")
-    print("Response Body:")
-    print(r.text)
-except Exception as e:
-    print(f"Connection Failed: {e}")
+def probe_once():
+    # Session keeps the TCP connection alive across calls (no reconnect RTT
+    # when this gets copied into a loop / load test)
+    session = requests.Session()
+    try:
+        print(f"Sending POST to {url}...")
+        r = session.post(url, json=payload, timeout=(3, 300))
+        print(f"Status: {r.status_code}")
+        print("Response Body:")
+        print(r.text)
+    except Exception as e:
+        print(f"Connection Failed: {e}")
+
+async def probe_concurrent(n):
+    """Fire n concurrent probes; smoke test for the /transcribe batching queue."""
+    import asyncio
+    import httpx
+
+    limits = httpx.Limits(max_connections=32)
+    timeout = httpx.Timeout(300.0, connect=3.0)
+    async with httpx.AsyncClient(limits=limits, timeout=timeout) as client:
+        async def one(i):
+            try:
+                r = await client.post(url, json=payload)
+                print(f"[{i}] Status: {r.status_code}")
+            except Exception as e:
+                print(f"[{i}] Connection Failed: {e}")
+
+        await asyncio.gather(*(one(i) for i in range(n)))
+
+if __name__ == "__main__":
+    # Usage: python debug_ai_endpoint.py [num_concurrent]
+    if len(sys.argv) > 1:
+        import asyncio
+        asyncio.run(probe_concurrent(int(sys.argv[1])))
+    else:
+        probe_once()
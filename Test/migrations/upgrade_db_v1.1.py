@@ -32,17 +32,26 @@ def upgrade_db(db_path):
             return
 
     print(f"📂 Opening database: {db_path}")
-    conn = sqlite3.connect(db_path)
+    # isolation_level=None: we manage the transaction explicitly below
+    conn = sqlite3.connect(db_path, isolation_level=None)
     cursor = conn.cursor()
-    
+
+    # WAL + NORMAL: one fsync per commit instead of one per ALTER
+    # (matters on spinning-disk NAS deployments)
+    cursor.execute("PRAGMA journal_mode=WAL;")
+    cursor.execute("PRAGMA synchronous=NORMAL;")
+
     try:
         # Get current columns
         cursor.execute("PRAGMA table_info(Playlists);")
         columns = {row[1] for row in cursor.fetchall()}
         print(f"📊 Current Playlists columns: {sorted(list(columns))}")
-        
+
         changes = []
-        
+
+        # All column additions in a single transaction
+        cursor.execute("BEGIN IMMEDIATE;")
+
         # 1. Type
         if 'Type' not in columns:
             print("➕ Adding column: Type")
@@ -67,8 +76,9 @@ def upgrade_db(db_path):
             cursor.execute("ALTER TABLE Playlists ADD COLUMN SharePassword TEXT;")
             changes.append("SharePassword")
         
+        conn.commit()
+
         if changes:
-            conn.commit()
             print(f"✅ Upgrade successful! Added: {', '.join(changes)}")
         else:
             print("✅ Database is already up to date.")
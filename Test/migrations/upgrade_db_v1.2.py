@@ -32,9 +32,14 @@ def upgrade_db(db_path):
             return
 
     print(f"📂 Opening database: {db_path}")
-    conn = sqlite3.connect(db_path)
+    # isolation_level=None: we manage the transaction explicitly below
+    conn = sqlite3.connect(db_path, isolation_level=None)
     cursor = conn.cursor()
-    
+
+    # WAL + NORMAL: one fsync per commit instead of one per statement
+    cursor.execute("PRAGMA journal_mode=WAL;")
+    cursor.execute("PRAGMA synchronous=NORMAL;")
+
     try:
         # Check if Plugins table exists
         cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='Plugins';")
@@ -42,6 +47,7 @@ def upgrade_db(db_path):
             print("✅ Plugins table already exists.")
         else:
             print("➕ Creating columns for Plugins table...")
+            cursor.execute("BEGIN IMMEDIATE;")
             cursor.execute("""
                 CREATE TABLE Plugins (
                     Id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -2,37 +2,21 @@ import psycopg2
 import os
 import sys
 
-# Load env vars
+# Load env vars (shared cached loader lives in Test/_env.py)
 script_dir = os.path.dirname(os.path.abspath(__file__))
 project_root = os.path.dirname(os.path.dirname(script_dir)) # Test/migrations -> Test -> v2
 env_file = os.path.join(project_root, ".env")
 
+sys.path.insert(0, os.path.dirname(script_dir))
+from _env import apply_env
+
 if os.path.exists(env_file):
     print(f"Loading env from: {env_file}")
-    with open(env_file) as f:
-        for line in f:
-            if line.strip() and not line.startswith('#'):
-                parts = line.strip().split('=', 1)
-                if len(parts) == 2:
-                    key, val = parts
-                    os.environ[key] = val
-                    # Debug sensitive keys by hiding value
-                    if "PASSWORD" in key or "KEY" in key:
-                        print(f"  Loaded {key}=***")
-                    else:
-                        print(f"  Loaded {key}={val}")
-
+    apply_env(env_file)
 else:
     print(f"File not found: {env_file}")
     sys.exit(1)
 
-if os.path.exists(env_file):
-    with open(env_file) as f:
-        for line in f:
-            if line.strip() and not line.startswith('#'):
-                key, val = line.strip().split('=', 1)
-                os.environ[key] = val
-
 def upgrade_schema():
     host = os.environ.get("POSTGRES_HOST", "postgres")
     user = os.environ.get("POSTGRES_USER", "postgres")
@@ -45,27 +29,27 @@ def upgrade_schema():
         conn = psycopg2.connect(host=host, database=dbname, user=user, password=password)
         cur = conn.cursor()
 
-            print("Checking/Creating table 'Lyrics'...")
-            # Matches C# Entity definition
-            # Use IF NOT EXISTS to be safe
-            cur.execute("""
-                CREATE TABLE IF NOT EXISTS "Lyrics" (
-                    "Id" SERIAL PRIMARY KEY,
-                    "MediaFileId" INTEGER NOT NULL REFERENCES "MediaFiles"("Id") ON DELETE CASCADE,
-                    "Content" TEXT,
-                    "Language" TEXT DEFAULT 'unknown',
-                    "Source" TEXT DEFAULT 'AI',
-                    "Version" TEXT DEFAULT 'v1',
-                    "CreatedAt" TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                );
-            """)
-            print("Table 'Lyrics' ensured.")
-
-            print("Ensuring Index on MediaFileId...")
-            cur.execute("""
-                CREATE INDEX IF NOT EXISTS "IX_Lyrics_MediaFileId" ON "Lyrics" ("MediaFileId");
-            """)
-            print("Index ensured.")
+        print("Checking/Creating table 'Lyrics'...")
+        # Matches C# Entity definition
+        # Use IF NOT EXISTS to be safe
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS "Lyrics" (
+                "Id" SERIAL PRIMARY KEY,
+                "MediaFileId" INTEGER NOT NULL REFERENCES "MediaFiles"("Id") ON DELETE CASCADE,
+                "Content" TEXT,
+                "Language" TEXT DEFAULT 'unknown',
+                "Source" TEXT DEFAULT 'AI',
+                "Version" TEXT DEFAULT 'v1',
+                "CreatedAt" TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            );
+        """)
+        print("Table 'Lyrics' ensured.")
+
+        print("Ensuring Index on MediaFileId...")
+        cur.execute("""
+            CREATE INDEX IF NOT EXISTS "IX_Lyrics_MediaFileId" ON "Lyrics" ("MediaFileId");
+        """)
+        print("Index ensured.")
 
         conn.commit()
         cur.close()